@@ -1,30 +1,25 @@
 # math.py
 import asyncio
-from mcp.server.fastmcp import FastMCP
-from mcp.server.fastmcp import FastMCP, Context
-from mcp.server.fastmcp.prompts import base
 from dotenv import load_dotenv
 
 # Read GOOGLE_API_KEY into env
 load_dotenv()
-mcp = FastMCP(name="apply", stateless_http=True)
   
 #from resume import fetch_resume
 from browser_use import Agent
 from langchain_openai import ChatOpenAI
-@mcp.tool()
 
-async def auto(link:str,resume):
+async def auto(link:str,resume: str = ""):
     resume=resume
     from browser_use import Agent, Browser
     from browser_use.browser.context import BrowserContext
-    from langchain_google_genai import ChatGoogleGenerativeAI
+    from backend.final.context import get_browser, get_gemini_model, get_resources
+    from backend.final.deadline import remaining
 
 # Reuse existing browser
-    browser = Browser()
-    import os
-    api_key= os.getenv("GOOGLE_API_KEY")
-    llm = ChatGoogleGenerativeAI(model='gemini-2.5-flash-preview-04-17',api_key=api_key)
+    browser = await get_browser()
+    resources = get_resources()
+    llm = await get_gemini_model()
     agent = Agent(
         task=f"""Apply for this job {link} using the {resume}""",
         llm=llm,
@@ -44,7 +39,23 @@ async def auto(link:str,resume):
            """,
 
     )
-    history = await agent.run()
+    try:
+        # asyncio.timeout(None) never expires; a client disconnect cancels
+        # this coroutine and agent.run() closes its browser context on the way out
+        async with asyncio.timeout(remaining()):
+            history = await agent.run()
+    except TimeoutError:
+        # Keep whatever the agent managed before the deadline
+        agent.stop()
+        history = agent.state.history
+        return {
+            "status": "timeout",
+            "message": "Application did not finish before the deadline",
+            "steps": history.extracted_content()
+        }
+    finally:
+        if resources is None:
+            await browser.close()
     result = history.final_result()
     print(result)
     return result
@@ -0,0 +1,120 @@
+# context.py
+import asyncio
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import httpx
+
+from backend.final.resume import Database
+from backend.final.state import close_state
+
+# Resources shared by every MCP session and by the FastAPI app. The first
+# app_lifespan entry creates them, the last exit closes them.
+
+
+@dataclass
+class AppContext:
+    db: Database
+    http: httpx.AsyncClient
+    # Loop the shared HTTP client was created on; httpx connections cannot
+    # be used from another loop
+    loop: asyncio.AbstractEventLoop
+    gemini_model: Any = None
+    browser: Any = None
+
+
+_resources: Optional[AppContext] = None
+_users = 0
+_lock = asyncio.Lock()
+_browser_lock = asyncio.Lock()
+_gemini_lock = asyncio.Lock()
+
+
+def get_resources() -> Optional[AppContext]:
+    """Return the shared resources, or None outside of app_lifespan"""
+    return _resources
+
+
+@asynccontextmanager
+async def app_lifespan(server: Any = None) -> AsyncIterator[AppContext]:
+    """Manage application lifecycle with type-safe context"""
+    global _resources, _users
+    async with _lock:
+        if _resources is None:
+            db = await Database(os.getenv("DB_PATH", "resumes.db")).connect()
+            _resources = AppContext(
+                db=db,
+                http=httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)),
+                loop=asyncio.get_running_loop(),
+            )
+        _users += 1
+        resources = _resources
+    try:
+        yield resources
+    finally:
+        async with _lock:
+            _users -= 1
+            if _users == 0:
+                _resources = None
+                await resources.http.aclose()
+                await resources.db.disconnect()
+                await close_state()
+                if resources.browser is not None:
+                    await resources.browser.close()
+
+
+@asynccontextmanager
+async def http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """
+    Yield the shared HTTP client, or a short-lived one outside of app_lifespan
+
+    Crew tools run on their own event loop in a worker thread, so they also
+    get a short-lived client.
+    """
+    if _resources is not None and asyncio.get_running_loop() is _resources.loop:
+        yield _resources.http
+    else:
+        async with httpx.AsyncClient() as client:
+            yield client
+
+
+async def get_gemini_model():
+    """
+    Return the shared Gemini client, creating it on first use
+
+    Only the apply agent needs Gemini, so a missing GOOGLE_API_KEY does not
+    stop the app from starting. Outside of app_lifespan a new client is returned.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    def create():
+        return ChatGoogleGenerativeAI(
+            model='gemini-2.5-flash-preview-04-17',
+            api_key=os.getenv("GOOGLE_API_KEY"),
+        )
+
+    if _resources is None:
+        return create()
+    async with _gemini_lock:
+        if _resources.gemini_model is None:
+            _resources.gemini_model = create()
+        return _resources.gemini_model
+
+
+async def get_browser():
+    """
+    Return the shared browser, launching it on first use
+
+    Outside of app_lifespan a new browser is returned and the caller owns it.
+    """
+    from browser_use import Browser
+
+    if _resources is None:
+        return Browser()
+    async with _browser_lock:
+        if _resources.browser is None:
+            _resources.browser = Browser()
+        return _resources.browser
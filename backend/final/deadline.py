@@ -0,0 +1,71 @@
+# deadline.py
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Request-scoped deadline and cancellation flag. Context variables follow the
+# work into asyncio tasks and into the threads crewai runs the crew and its
+# tools in, so every layer can check them without extra arguments.
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+_cancelled: ContextVar[Optional[threading.Event]] = ContextVar("cancelled", default=None)
+
+
+class RunCancelled(BaseException):
+    """
+    Raised inside a run when its client went away or its deadline passed
+
+    Like asyncio.CancelledError it derives from BaseException so the retry
+    and error handling in crewai does not swallow it.
+    """
+
+
+class DeadlineExceeded(RunCancelled):
+    """Raised inside a run that is past its deadline"""
+
+
+@contextmanager
+def request_scope(timeout: Optional[float] = None) -> Iterator[threading.Event]:
+    """
+    Set a deadline and cancellation flag for the work started inside the block
+
+    Args:
+        timeout: Seconds the work may take (no deadline if None)
+
+    Returns:
+        Event that cancels the work when set; it is set on exit of the block
+    """
+    cancelled = threading.Event()
+    deadline_token = _deadline.set(time.monotonic() + timeout if timeout is not None else None)
+    cancelled_token = _cancelled.set(cancelled)
+    try:
+        yield cancelled
+    finally:
+        cancelled.set()
+        _cancelled.reset(cancelled_token)
+        _deadline.reset(deadline_token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline, or None if there is no deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def check_cancelled() -> None:
+    """Raise RunCancelled if the current run was cancelled or is past its deadline"""
+    cancelled = _cancelled.get()
+    if cancelled is not None and cancelled.is_set():
+        raise RunCancelled("client disconnected")
+    if remaining() == 0:
+        raise DeadlineExceeded("deadline exceeded")
+
+
+def http_timeout(default: float = 60.0) -> float:
+    """Timeout for an outgoing HTTP call, capped by the time left in the run"""
+    left = remaining()
+    return default if left is None else min(default, left)
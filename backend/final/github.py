@@ -1,14 +1,16 @@
 # github.py
+import os
 from typing import Any, Dict
-import httpx
-from mcp.server.fastmcp import FastMCP
-from mcp.server.fastmcp import FastMCP, Context
-from mcp.server.fastmcp.prompts import base
 
-mcp = FastMCP(name="github", stateless_http=True)
+from backend.final.context import http_client
+from backend.final.deadline import check_cancelled, http_timeout
+from backend.final.state import get_state, wait_for_token
+
+GITHUB_SNAPSHOT_TTL = float(os.getenv("GITHUB_SNAPSHOT_TTL", 3600))
+# Unauthenticated GitHub API quota is 60 requests per hour per IP
+GITHUB_RATE_PER_HOUR = float(os.getenv("GITHUB_RATE_PER_HOUR", 60))
   
 
-@mcp.tool()
 async def fetch_github_repos(username: str):
     """
     Fetch repositories for a GitHub user
@@ -19,12 +21,22 @@ async def fetch_github_repos(username: str):
     Returns:
         Dictionary containing repository data
     """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"https://api.github.com/users/{username}/repos")
+    check_cancelled()
+    state = get_state()
+    snapshot = await state.get("github", username)
+    if snapshot is not None:
+        return snapshot
+
+    await wait_for_token("github", GITHUB_RATE_PER_HOUR / 3600, GITHUB_RATE_PER_HOUR)
+    async with http_client() as client:
+        response = await client.get(
+            f"https://api.github.com/users/{username}/repos",
+            timeout=http_timeout()
+        )
         
         if response.status_code == 200:
             repos = response.json()
-            return {
+            snapshot = {
                 "status": "success",
                 "count": len(repos),
                 "repos": [
@@ -41,6 +53,8 @@ async def fetch_github_repos(username: str):
                     for repo in repos
                 ]
             }
+            await state.set("github", username, snapshot, ttl=GITHUB_SNAPSHOT_TTL)
+            return snapshot
         else:
             return {
                 "status": "error",
@@ -0,0 +1,128 @@
+# jobs.py
+import base64
+import json
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Projection and pagination over a stored job result set
+
+View = Literal["summary", "full"]
+
+SUMMARY_FIELDS = ("id", "title", "company", "location", "link", "salary", "skills")
+# Largest page a client may request
+MAX_PAGE_SIZE = 100
+# Summary view keeps the start of the description so job cards still render
+SNIPPET_LENGTH = 280
+
+
+def project(job: Dict[str, Any], view: View) -> Dict[str, Any]:
+    """
+    Reduce a job to the fields needed for the requested view
+
+    Args:
+        job: Job as stored for the run
+        view: "summary" for list views, "full" for every field
+
+    Returns:
+        Projected job
+    """
+    if view == "full":
+        return job
+    summary = {field: job.get(field) for field in SUMMARY_FIELDS}
+    description = job.get("description") or ""
+    if len(description) > SNIPPET_LENGTH:
+        description = description[:SNIPPET_LENGTH].rstrip() + "..."
+    summary["description"] = description
+    return summary
+
+
+def encode_cursor(run_id: str, offset: int) -> str:
+    """Opaque cursor for the given offset into a run's result set"""
+    return base64.urlsafe_b64encode(f"{run_id}:{offset}".encode()).decode()
+
+
+def parse_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Run id and offset stored in a cursor
+
+    Raises ValueError if the cursor is malformed.
+    """
+    run_id, _, offset = base64.urlsafe_b64decode(cursor.encode()).decode().partition(":")
+    offset = int(offset)
+    if not run_id or offset < 0:
+        raise ValueError("malformed cursor")
+    return run_id, offset
+
+
+def decode_cursor(run_id: str, cursor: Optional[str]) -> int:
+    """
+    Offset for a cursor
+
+    Raises ValueError if the cursor is malformed or belongs to another run.
+    """
+    if not cursor:
+        return 0
+    cursor_run_id, offset = parse_cursor(cursor)
+    if cursor_run_id != run_id:
+        raise ValueError("cursor belongs to another run")
+    return offset
+
+
+def paginate(
+    run_id: str,
+    jobs: List[Dict[str, Any]],
+    view: View = "full",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Return one page of a stored result set
+
+    Args:
+        run_id: Id of the stored run, used to fetch later pages and job details
+        jobs: Every job in the run
+        view: Projection applied to each job
+        limit: Page size (every remaining job if None)
+        cursor: Cursor returned with the previous page
+
+    Returns:
+        Page with its jobs, the total count and the cursor for the next page
+    """
+    start = decode_cursor(run_id, cursor)
+    end = len(jobs) if limit is None else start + limit
+    return {
+        "run_id": run_id,
+        "total": len(jobs),
+        "jobs": [project(job, view) for job in jobs[start:end]],
+        "next_cursor": encode_cursor(run_id, end) if end < len(jobs) else None,
+    }
+
+
+def find_job(jobs: List[Dict[str, Any]], job_id: str) -> Optional[Dict[str, Any]]:
+    """Job with the given id, or None"""
+    for job in jobs:
+        if str(job.get("id")) == job_id:
+            return job
+    return None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Compact JSON response, using orjson when it is installed
+
+    Returning it from an endpoint also skips FastAPI's jsonable_encoder pass,
+    which matters for large result sets that are already plain JSON.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
@@ -1,13 +1,6 @@
 # math.py
 import asyncio
 import json
-import httpx
-from mcp.server.fastmcp import FastMCP
-from mcp.server.fastmcp import FastMCP, Context
-from mcp.server.fastmcp.prompts import base
-
-mcp = FastMCP(name="research", stateless_http=True)
-
 from pydantic import BaseModel
 from typing import Any, Dict, List, Optional
 from crewai.tools import tool
@@ -22,13 +15,27 @@ from crewai_tools import (
 # Environment variables (to be loaded from .env)
 from dotenv import load_dotenv
 load_dotenv()
-llm= LLM(
-    model= "sonar-deep-research",
-    base_url="https://api.perplexity.ai/",
-    api_key=os.getenv("PERPLEXITY_API_KEY")
 
+from backend.final.deadline import DeadlineExceeded, check_cancelled, http_timeout, remaining
+from backend.final.github import fetch_github_repos
+from backend.final.search import search_perplexity
 
-)
+# Upper bound for one sonar-deep-research call (seconds)
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", 600))
+
+def build_llm(timeout: Optional[float] = None):
+    return LLM(
+        model= "sonar-deep-research",
+        base_url="https://api.perplexity.ai/",
+        api_key=os.getenv("PERPLEXITY_API_KEY"),
+        timeout=timeout
+    )
+
+def llm_timeout() -> float:
+    """Timeout for the next LLM call, capped by the time left in the run"""
+    return max(1.0, http_timeout(LLM_CALL_TIMEOUT))
+
+llm= build_llm()
 gemini_model = llm
 class Job(BaseModel):
     id: str
@@ -46,36 +53,11 @@ class JobList(BaseModel):
 @tool("perplexitySearch")
 async def perplexitySearch (query: str):
         """Searches the internet using Perplexity API for the most up-to-date information"""
-        
-        perplexity_api_key = os.getenv("PERPLEXITY_API_KEY")
-        
-        headers = {
-            "Authorization": f"Bearer {perplexity_api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "query": query,
-            "max_tokens": 2000
-        }
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {
-                    "error": f"Error {response.status_code}",
-                    "message": response.text
-                }
+        # Goes through the shared cache and rate-limit bucket in search.py
+        check_cancelled()
+        return await search_perplexity(None, query)
 #from resume import fetch_resume
 
-@mcp.tool()
 async def run_job_research_workflow(user:str,resume):
     """
     Run the analysis agent to analyze resume and GitHub data
@@ -98,46 +80,6 @@ async def run_job_research_workflow(user:str,resume):
       #      "status": "error",
        ##}
     #resume_data = resume_result["data"]
-    # github.py
-
-    async def fetch_github_repos(username: str):
-        """
-        Fetch repositories for a GitHub user
-        
-        Args:
-            username: GitHub username
-            
-        Returns:
-            Dictionary containing repository data
-        """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"https://api.github.com/users/{username}/repos")
-            
-            if response.status_code == 200:
-                repos = response.json()
-                return {
-                    "status": "success",
-                    "count": len(repos),
-                    "repos": [
-                        {
-                            "name": repo["name"],
-                            "description": repo["description"],
-                            "language": repo["language"],
-                            "stars": repo["stargazers_count"],
-                            "forks": repo["forks_count"],
-                            "url": repo["html_url"],
-                            "created_at": repo["created_at"],
-                            "updated_at": repo["updated_at"]
-                        }
-                        for repo in repos
-                    ]
-                }
-            else:
-                return {
-                    "status": "error",
-                    "message": f"Failed to fetch GitHub repositories: {response.status_code}",
-                    "details": response.text
-                }
     # Get GitHub data
     github_result = await fetch_github_repos(user)
     if github_result["status"] == "error":
@@ -146,6 +88,8 @@ async def run_job_research_workflow(user:str,resume):
             "message": f"Failed to fetch GitHub repositories: {github_result['message']}"
         }
     search_tool= perplexitySearch
+    # Per-run LLM so its call timeout can follow this run's deadline
+    run_llm = build_llm(timeout=llm_timeout())
     coder= CodeInterpreterTool()
     #from crewai_tools import AIMindTool
 
@@ -175,7 +119,7 @@ async def run_job_research_workflow(user:str,resume):
         verbose=True,
         allow_delegation=False,
         tools=[search_tool, coder],
-        llm=llm,
+        llm=run_llm,
         code_execution_mode="safe",       # correct: one of the allowed literals
         allow_code_execution=True,        # correct: boolean flag
 )
@@ -235,7 +179,7 @@ async def run_job_research_workflow(user:str,resume):
         allow_delegation=False,
         code_execution_mode="safe",
         allow_code_execution=True,
-        llm=llm,
+        llm=run_llm,
         tools=[search_tool]
     )
 
@@ -331,23 +275,48 @@ async def run_job_research_workflow(user:str,resume):
     
         
         # Run recommendation task
+    def on_step(step):
+        # Called after every agent step. A call already in flight cannot be
+        # interrupted, so a disconnect is noticed here, between steps, and
+        # each LLM call is bounded by the time left in the run instead.
+        check_cancelled()
+        run_llm.timeout = llm_timeout()
+
+    def partial_result():
+        # Keep the market analysis if it finished before the deadline
+        return {
+            "status": "timeout",
+            "message": "Job research did not finish before the deadline",
+            "analysis": analysis_task.output.raw if analysis_task.output else None,
+            "jobs": []
+        }
+
     run_crew = Crew(
         agents=[analysis_agent,recommendation_agent],
         tasks=[analysis_task,job_search_task],
         verbose=True,
         process=Process.sequential,
-        
+        step_callback=on_step,
         #memory=True,
     )
     
     
-    recommendations = run_crew.kickoff()
+    # kickoff_async runs the crew in a worker thread so the event loop stays free
+    try:
+        recommendations = await run_crew.kickoff_async()
+    except DeadlineExceeded:
+        return partial_result()
+    except Exception:
+        # An LLM call cut short by its timeout surfaces as a litellm error
+        if remaining() == 0:
+            return partial_result()
+        raise
     print(recommendations)
     results= job_search_task.output
     if recommendations.pydantic:
         return recommendations.pydantic
     elif recommendations.json_dict:
-        return json.dumps(recommendations.json_dict, indent=2)
+        return recommendations.json_dict
     else:
         return results
 
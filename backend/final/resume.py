@@ -1,14 +1,7 @@
 # math.py
-from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
-from dataclasses import dataclass
 import sqlite3
 from typing import Any, Dict, Optional
-from mcp.server.fastmcp import FastMCP
-from mcp.server.fastmcp import FastMCP, Context
-from mcp.server.fastmcp.prompts import base
-
-mcp = FastMCP(name="resume", stateless_http=True)
+from mcp.server.fastmcp import Context
 
 class Database:
     def __init__(self, db_path="resumes.db"):
@@ -55,31 +48,8 @@ class Database:
             return dict(row)
         return None
 
-# Define context for application
-@dataclass
-class AppContext:
-    db: Database
-    gemini_model: Any
-
-# Create MCP server
-
-# Lifecycle management
-@asynccontextmanager
-async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
-    from research import llm
-    """Manage application lifecycle with type-safe context"""
-    # Initialize resources on startup
-    db = await Database().connect()
-    
-    # Initialize Gemini model for agents
-
-    
-    try:
-        yield AppContext(db=db, gemini_model=llm)
-    finally:
-        # Cleanup on shutdown
-        await db.disconnect()
-@mcp.tool()
+# Shared resources and app_lifespan live in context.py; the consolidated
+# server in server.py provides ctx.request_context.lifespan_context.db
 def fetch_resume(ctx: Context, resume_id: Optional[int] = None) -> Dict[str, Any]:
     """
     Fetch a resume from the database
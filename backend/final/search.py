@@ -1,18 +1,18 @@
 # math.py
-from contextvars import Context
+import hashlib
 import os
 from typing import Any, Dict
-import httpx
-from mcp.server.fastmcp import FastMCP
 
+from mcp.server.fastmcp import Context
 
-from mcp.server.fastmcp import FastMCP, Context
-from mcp.server.fastmcp.prompts import base
+from backend.final.context import http_client
+from backend.final.deadline import check_cancelled, http_timeout
+from backend.final.state import get_state, wait_for_token
 
-mcp = FastMCP(name="search", stateless_http=True)
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", 3600))
+PERPLEXITY_RATE_PER_MIN = float(os.getenv("PERPLEXITY_RATE_PER_MIN", 50))
   
 
-@mcp.tool(description="tool used for searching the web")
 async def search_perplexity(ctx: Context, query: str) -> Dict[str, Any]:
     """
     Search for information using Perplexity API
@@ -23,6 +23,13 @@ async def search_perplexity(ctx: Context, query: str) -> Dict[str, Any]:
     Returns:
         Dictionary containing search results
     """
+    check_cancelled()
+    state = get_state()
+    cache_key = hashlib.sha256(query.encode()).hexdigest()
+    cached = await state.get("search", cache_key)
+    if cached is not None:
+        return cached
+
     perplexity_api_key = os.getenv("PERPLEXITY_API_KEY")
     
     headers = {
@@ -35,15 +42,19 @@ async def search_perplexity(ctx: Context, query: str) -> Dict[str, Any]:
         "max_tokens": 2000
     }
     
-    async with httpx.AsyncClient() as client:
+    await wait_for_token("perplexity", PERPLEXITY_RATE_PER_MIN / 60, PERPLEXITY_RATE_PER_MIN)
+    async with http_client() as client:
         response = await client.post(
             "https://api.perplexity.ai/chat/completions",
             headers=headers,
-            json=payload
+            json=payload,
+            timeout=http_timeout()
         )
         
         if response.status_code == 200:
-            return response.json()
+            result = response.json()
+            await state.set("search", cache_key, result, ttl=SEARCH_CACHE_TTL)
+            return result
         else:
             return {
                 "error": f"Error {response.status_code}",
@@ -0,0 +1,35 @@
+# server.py
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+from backend.final.auto import auto
+from backend.final.context import app_lifespan
+from backend.final.github import fetch_github_repos
+from backend.final.research import run_job_research_workflow
+from backend.final.resume import fetch_resume
+from backend.final.search import search_perplexity
+
+# One MCP server for every tool in the package. With a single web worker
+# main.py serves it over SSE at /mcp/sse and its sessions share the FastAPI
+# app's lifespan. With several workers it runs as its own process, because
+# SSE sessions cannot be shared between workers.
+mcp = FastMCP(
+    name="job-research",
+    lifespan=app_lifespan,
+    sse_path="/mcp/sse",
+    message_path="/mcp/messages/",
+    port=int(os.getenv("MCP_PORT", 8001)),
+)
+
+mcp.add_tool(run_job_research_workflow)
+mcp.add_tool(fetch_resume)
+mcp.add_tool(search_perplexity, description="tool used for searching the web")
+mcp.add_tool(fetch_github_repos)
+mcp.add_tool(auto)
+
+
+if __name__ == "__main__":
+    # stdio for MCP clients that launch the server themselves, sse to serve
+    # the MCP endpoint next to a multi-worker web process
+    mcp.run(transport=os.getenv("MCP_TRANSPORT", "stdio"))
@@ -0,0 +1,314 @@
+# state.py
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from backend.final.deadline import check_cancelled, remaining
+
+# Shared state visible to every uvicorn worker on one host. Selected with
+# STATE_BACKEND; "sqlite" is the default. SQLite in WAL mode relies on shared
+# memory, so STATE_DB_PATH must be on a local disk and cannot be shared
+# between nodes over a network filesystem. Multi-node deployments need a
+# networked backend added with register_backend.
+
+# Expired rows are purged at most this often (seconds)
+PURGE_INTERVAL = 60
+
+
+class StateBackend(ABC):
+    """Interface every shared-state backend implements"""
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Return the stored value, or None if it is missing or expired"""
+
+    @abstractmethod
+    async def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value, optionally expiring after ttl seconds"""
+
+    @abstractmethod
+    async def claim(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Store the value only if the key is absent; True if this caller won"""
+
+    @abstractmethod
+    async def delete(self, namespace: str, key: str) -> None:
+        """Remove a key"""
+
+    @abstractmethod
+    async def take_token(self, bucket: str, rate: float, capacity: float) -> bool:
+        """
+        Take one token from a shared token bucket
+
+        Args:
+            bucket: Name of the bucket
+            rate: Tokens refilled per second
+            capacity: Maximum tokens the bucket holds
+
+        Returns:
+            True if a token was taken, False if the bucket is empty
+        """
+
+    async def close(self) -> None:
+        """Release any resources held by the backend"""
+
+
+class MemoryStateBackend(StateBackend):
+    """Process-local backend, only suitable for a single worker or tests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[tuple, tuple] = {}
+        self._buckets: Dict[str, tuple] = {}
+        self._last_purge = 0.0
+
+    def _live(self, namespace, key, now):
+        entry = self._data.get((namespace, key))
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._data[(namespace, key)]
+            return None
+        return entry
+
+    def _purge(self, now):
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        expired = [
+            k for k, (_, expires_at) in self._data.items()
+            if expires_at is not None and expires_at <= now
+        ]
+        for k in expired:
+            del self._data[k]
+
+    async def get(self, namespace, key):
+        with self._lock:
+            entry = self._live(namespace, key, time.time())
+            return entry[0] if entry else None
+
+    async def set(self, namespace, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            self._data[(namespace, key)] = (value, now + ttl if ttl else None)
+
+    async def claim(self, namespace, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            if self._live(namespace, key, now):
+                return False
+            self._data[(namespace, key)] = (value, now + ttl if ttl else None)
+            return True
+
+    async def delete(self, namespace, key):
+        with self._lock:
+            self._data.pop((namespace, key), None)
+
+    async def take_token(self, bucket, rate, capacity):
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(bucket, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            taken = tokens >= 1
+            self._buckets[bucket] = (tokens - 1 if taken else tokens, now)
+            return taken
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    SQLite backend in WAL mode, shared by every process on the host using the same file
+
+    sqlite3 calls block (up to the busy timeout while another worker holds the
+    write lock), so they run off the event loop. They get a thread of their
+    own rather than the loop's default executor, which long crew runs occupy;
+    calls are serialized on one connection anyway, so one thread is enough.
+    """
+
+    def __init__(self, db_path: str = "state.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state")
+        self.conn = sqlite3.connect(
+            db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS state (
+            namespace TEXT,
+            key TEXT,
+            value TEXT,
+            expires_at REAL,
+            PRIMARY KEY (namespace, key)
+        )
+        ''')
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS state_expires_at ON state (expires_at)"
+        )
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS buckets (
+            name TEXT PRIMARY KEY,
+            tokens REAL,
+            updated_at REAL
+        )
+        ''')
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        # BEGIN IMMEDIATE takes the write lock up front so read-modify-write
+        # sequences are atomic across processes.
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self.conn)
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def _get(self, namespace, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM state WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return json.loads(row[0])
+
+    def _set(self, namespace, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            if now - self._last_purge >= PURGE_INTERVAL:
+                self._last_purge = now
+                self.conn.execute("DELETE FROM state WHERE expires_at <= ?", (now,))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl if ttl else None),
+            )
+
+    def _claim(self, namespace, key, value, ttl):
+        now = time.time()
+
+        def claim(conn):
+            conn.execute(
+                "DELETE FROM state WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (namespace, key, now),
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl if ttl else None),
+            )
+            return cursor.rowcount == 1
+
+        return self._transaction(claim)
+
+    def _delete(self, namespace, key):
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def _take_token(self, bucket, rate, capacity):
+        now = time.time()
+
+        def take(conn):
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE name = ?", (bucket,)
+            ).fetchone()
+            tokens, updated_at = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            taken = tokens >= 1
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (bucket, tokens - 1 if taken else tokens, now),
+            )
+            return taken
+
+        return self._transaction(take)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def get(self, namespace, key):
+        return await self._run(self._get, namespace, key)
+
+    async def set(self, namespace, key, value, ttl=None):
+        await self._run(self._set, namespace, key, value, ttl)
+
+    async def claim(self, namespace, key, value, ttl=None):
+        return await self._run(self._claim, namespace, key, value, ttl)
+
+    async def delete(self, namespace, key):
+        await self._run(self._delete, namespace, key)
+
+    async def take_token(self, bucket, rate, capacity):
+        return await self._run(self._take_token, bucket, rate, capacity)
+
+    async def close(self):
+        await self._run(self.conn.close)
+        self._executor.shutdown()
+
+
+_BACKENDS: Dict[str, Callable[[], StateBackend]] = {
+    "sqlite": lambda: SQLiteStateBackend(os.getenv("STATE_DB_PATH", "state.db")),
+    "memory": MemoryStateBackend,
+}
+_state: Optional[StateBackend] = None
+
+
+def register_backend(name: str, factory: Callable[[], StateBackend]) -> None:
+    """
+    Make a backend selectable through STATE_BACKEND
+
+    Args:
+        name: Value of STATE_BACKEND that selects this backend
+        factory: Callable returning a StateBackend instance
+    """
+    _BACKENDS[name] = factory
+
+
+def get_state() -> StateBackend:
+    """Return the process-wide backend, creating it on first use"""
+    global _state
+    if _state is None:
+        name = os.getenv("STATE_BACKEND", "sqlite")
+        if name not in _BACKENDS:
+            raise ValueError(f"Unknown STATE_BACKEND: {name}")
+        _state = _BACKENDS[name]()
+    return _state
+
+
+async def close_state() -> None:
+    """Close the process-wide backend if one was created"""
+    global _state
+    if _state is not None:
+        state, _state = _state, None
+        await state.close()
+
+
+async def wait_for_token(bucket: str, rate: float, capacity: float, poll: float = 0.25) -> None:
+    """
+    Wait until a token is available in a shared token bucket
+
+    Args:
+        bucket: Name of the bucket
+        rate: Tokens refilled per second
+        capacity: Maximum tokens the bucket holds
+        poll: Seconds to sleep between attempts
+    """
+    state = get_state()
+    while not await state.take_token(bucket, rate, capacity):
+        check_cancelled()
+        delay = max(poll, 1 / rate if rate else poll)
+        left = remaining()
+        # Wake up at the deadline so check_cancelled can end the wait
+        await asyncio.sleep(delay if left is None else min(delay, left))
@@ -24,6 +24,10 @@ document.addEventListener("DOMContentLoaded", () => {
   const pdfInput = document.getElementById("pdfInput");
 
   let allJobs = [];
+  // The backend returns summary listings; full job details are fetched by
+  // run id and job id when a card is expanded or applied to
+  let runId = null;
+  const fullJobs = {};
   let currentPage = 1;
   const jobsPerPage = 10;
   let resumeText = "";
@@ -109,7 +113,9 @@ document.addEventListener("DOMContentLoaded", () => {
     const cachedData = sessionStorage.getItem(currentCacheKey);
     if (cachedData) {
       console.log("Loading jobs from cache...");
-      allJobs = JSON.parse(cachedData);
+      const cached = JSON.parse(cachedData);
+      allJobs = cached.jobs || [];
+      runId = cached.runId || null;
       loadingIndicator.classList.add("hidden"); // Hide loading since we have data
       if (!Array.isArray(allJobs) || allJobs.length === 0) {
         jobResults.classList.add("hidden");
@@ -133,7 +139,8 @@ document.addEventListener("DOMContentLoaded", () => {
       // IMPORTANT: Backend expects "resume_id", not "resume_text"
       const requestBody = {
         github_username: githubUsername,
-        resume_id: resumeText || "default-resume" // Use extracted text as resume_id
+        resume_id: resumeText || "default-resume", // Use extracted text as resume_id
+        view: "summary" // Compact listings; details come from /jobs/{run_id}/{job_id}
       };
 
       console.log("Sending request to backend:", requestBody);
@@ -177,9 +184,10 @@ document.addEventListener("DOMContentLoaded", () => {
       // Extract the jobs array from the response
       // The backend returns { jobs: [...] } so we need to get the jobs array
       allJobs = responseData.jobs || [];
+      runId = responseData.run_id || null;
 
       // Store the fetched data in cache
-      sessionStorage.setItem(currentCacheKey, JSON.stringify(allJobs));
+      sessionStorage.setItem(currentCacheKey, JSON.stringify({ runId, jobs: allJobs }));
 
       // Hide the loading spinner
       loadingIndicator.classList.add("hidden");
@@ -255,13 +263,17 @@ document.addEventListener("DOMContentLoaded", () => {
           <div class="flex flex-wrap gap-2 mb-4">
             ${(job.skills || []).map((s) => `<span class="bg-gray-100 text-gray-800 text-xs px-2 py-1 rounded">${s}</span>`).join("")}
           </div>
-          <p class="text-gray-600 mb-4">${job.description}</p>
+          <p class="text-gray-600 mb-4 job-description">${job.description}</p>
+          <p class="text-gray-600 mb-4 job-explanation hidden"></p>
           <div class="flex justify-between items-center">
             <div>
               <p class="text-sm text-gray-500">${job.salary || ""}</p>
               <p class="text-sm text-gray-500">${job.type || ""}</p>
             </div>
-            <button class="btn-primary apply-btn" data-job-id="${job.id}">Apply Now</button>
+            <div>
+              ${runId ? `<button class="btn-secondary details-btn mr-2" data-job-id="${job.id}">Show details</button>` : ""}
+              <button class="btn-primary apply-btn" data-job-id="${job.id}">Apply Now</button>
+            </div>
           </div>
         </div>
       </div>`;
@@ -273,6 +285,42 @@ document.addEventListener("DOMContentLoaded", () => {
 
 
 
+  // ───────────────────────────────────────────────────────────────────────────
+  // Fetch the full details of a job from the stored run
+  // ───────────────────────────────────────────────────────────────────────────
+  async function loadJobDetails(jobId) {
+    if (fullJobs[jobId]) return fullJobs[jobId];
+    if (!runId) return null;
+
+    const response = await fetch(
+      `http://localhost:8080/jobs/${encodeURIComponent(runId)}/${encodeURIComponent(jobId)}`,
+      { headers: { "Accept": "application/json" } }
+    );
+    if (!response.ok) {
+      throw new Error(`Failed to load job details: ${response.status} ${response.statusText}`);
+    }
+    fullJobs[jobId] = await response.json();
+    return fullJobs[jobId];
+  }
+
+  async function showJobDetails(button) {
+    const card = button.closest(".hover-3d-card");
+    try {
+      button.disabled = true;
+      const job = await loadJobDetails(button.dataset.jobId);
+      card.querySelector(".job-description").textContent = job.description || "";
+      const explanation = card.querySelector(".job-explanation");
+      if (job.explanation_for_recommendation) {
+        explanation.textContent = job.explanation_for_recommendation;
+        explanation.classList.remove("hidden");
+      }
+      button.remove();
+    } catch (err) {
+      button.disabled = false;
+      showErrorModal(err.message);
+    }
+  }
+
   async function applyForJob(jobId) {
     try {
       const applyBtn = document.querySelector(`.apply-btn[data-job-id="${jobId}"]`);
@@ -281,19 +329,18 @@ document.addEventListener("DOMContentLoaded", () => {
         applyBtn.disabled = true;
       }
 
-      // Instead of sending the link in the request body, append it as a query parameter
-      const response = await fetch(`http://localhost:8080/get_jobs/apply?link=${encodeURIComponent(jobId)}`, {
+      // Summary listings may not carry everything; apply with the full job
+      const job = await loadJobDetails(jobId);
+      const response = await fetch("http://localhost:8080/get_jobs/apply", {
         method: "POST",
         headers: {
+          "Content-Type": "application/json",
           "Accept": "application/json"
         },
         body: JSON.stringify({
-          "github_username": githubUsername,
-          "resume_id": resumeText || "default-resume",
-          "job_id": jobId
+          "link": (job && job.link) || jobId,
+          "resume_id": resumeText || "default-resume"
         })
-
-        // No body needed as the link is in the URL
       });
 
       if (!response.ok) {
@@ -392,6 +439,9 @@ document.addEventListener("DOMContentLoaded", () => {
       card.querySelector(".apply-btn")?.addEventListener("click", function() {
         applyForJob(this.dataset.jobId);
       });
+      card.querySelector(".details-btn")?.addEventListener("click", function() {
+        showJobDetails(this);
+      });
       // The 3D tilt effect is still handled in effects.js
     });
   }
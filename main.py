@@ -27,15 +27,44 @@ from mcp.server.fastmcp.prompts import base
 
 from backend.final.research import run_job_research_workflow
 from backend.final.auto import auto
+from backend.final.state import get_state
+from backend.final.context import app_lifespan
+from backend.final.deadline import DeadlineExceeded, RunCancelled, request_scope
+from backend.final.jobs import MAX_PAGE_SIZE, View, FastJSONResponse, find_job, paginate, parse_cursor
+import hashlib
+import logging
+import uuid
 #from final.github import fetch_github_repos
 #
 from fastapi.staticfiles import StaticFiles
-from fastapi_mcp import FastApiMCP
+from backend.final.server import mcp as mcp_server
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import Query, Body
-from pydantic import BaseModel
+from fastapi import Query, Body, Request, Response, HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel, Field
 
-app = FastAPI()
+# A claimed run expires after RUN_TIMEOUT so a crashed worker cannot block it forever
+RUN_TIMEOUT = float(os.environ.get("RUN_TIMEOUT", 1800))
+RUN_RESULT_TTL = float(os.environ.get("RUN_RESULT_TTL", 3600))
+RUN_POLL_INTERVAL = 2
+# Request deadlines; the run gets DEADLINE_GRACE extra seconds to return
+# partial results before it is cancelled outright
+JOB_DEADLINE = float(os.environ.get("JOB_DEADLINE", 900))
+APPLY_DEADLINE = float(os.environ.get("APPLY_DEADLINE", 600))
+DEADLINE_GRACE = 30
+DISCONNECT_POLL_INTERVAL = 1
+# A waiter refreshes its marker every RUN_POLL_INTERVAL; once it stops for
+# WAITER_TTL the claiming worker treats the run as unwanted
+WAITER_TTL = RUN_POLL_INTERVAL * 3
+_shared_runs = set()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Same shared resources as the consolidated MCP server in backend/final/server.py
+    async with app_lifespan():
+        yield
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware - this fixes the CORS issue
 app.add_middleware(
@@ -46,21 +75,175 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+async def run_until_disconnect(http_request: Request, coro, timeout: float):
+    """
+    Run a coroutine under a request deadline, cancelling it if the client goes away
+
+    Args:
+        http_request: Incoming request, polled for client disconnects
+        coro: Work to run for the request
+        timeout: Seconds before the deadline passes
+
+    Returns:
+        Result of the coroutine
+    """
+    loop = asyncio.get_running_loop()
+    with request_scope(timeout) as cancelled:
+        # The task copies the current context, so the deadline and the
+        # cancellation flag reach every tool and thread the run starts
+        task = asyncio.ensure_future(coro)
+        hard_deadline = loop.time() + timeout + DEADLINE_GRACE
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+                if done:
+                    try:
+                        return task.result()
+                    except DeadlineExceeded:
+                        # Raised before the run could build a partial result
+                        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+                    except RunCancelled:
+                        return Response(status_code=499)
+                if await http_request.is_disconnected():
+                    # Nobody is listening; 499 is the conventional "client closed request"
+                    return Response(status_code=499)
+                if loop.time() >= hard_deadline:
+                    raise HTTPException(status_code=504, detail="Request deadline exceeded")
+        finally:
+            if not task.done():
+                cancelled.set()
+                task.cancel()
+
 class JobRequest(BaseModel):
     github_username: str
     resume_id: str
+    # "summary" drops explanation_for_recommendation and shortens descriptions;
+    # full details are fetched per job from /jobs/{run_id}/{job_id}
+    view: View = "full"
+    limit: Optional[int] = Field(default=None, gt=0, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = None
 
 class ApplyRequest(BaseModel):
     link: str
+    resume_id: str = ""
 
 @app.post("/get_jobs",
          operation_id="get the jobs",
          summary="This tool is used to get jobs")
 
-async def job(request: JobRequest):
+async def job(request: JobRequest, http_request: Request):
     github = request.github_username
     resume = request.resume_id
-    return await run_job_research_workflow(github, resume)
+    if request.cursor:
+        # Later pages come from the stored run named in the cursor; never
+        # start a crew run just to find out a cursor is stale or malformed
+        try:
+            run_id, _ = parse_cursor(request.cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        return job_page(run_id, await stored_jobs(run_id), request.view, request.limit, request.cursor)
+    outcome = await run_until_disconnect(
+        http_request, research_once(github, resume), JOB_DEADLINE
+    )
+    if isinstance(outcome, Response):
+        return outcome
+    run_id, result = outcome
+    # Errors, timeouts and unparsed crew output are not stored, so they are
+    # returned as they are
+    if not isinstance(result, dict) or "status" in result or not isinstance(result.get("jobs"), list):
+        return result
+    return job_page(run_id, result["jobs"], request.view, request.limit, request.cursor)
+
+def job_page(run_id: str, jobs: List[Dict[str, Any]], view: View, limit: Optional[int], cursor: Optional[str]):
+    try:
+        page = paginate(run_id, jobs, view=view, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return FastJSONResponse(page)
+
+async def stored_jobs(run_id: str) -> List[Dict[str, Any]]:
+    result = await get_state().get("results", run_id)
+    if not isinstance(result, dict):
+        raise HTTPException(status_code=404, detail="Run not found or expired")
+    return result.get("jobs") or []
+
+@app.get(
+    "/jobs/{run_id}",
+    operation_id="list_stored_jobs",
+    summary="Page through the jobs of a finished /get_jobs run"
+)
+async def list_jobs(
+    run_id: str,
+    view: View = "summary",
+    limit: Optional[int] = Query(default=20, gt=0, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
+    return job_page(run_id, await stored_jobs(run_id), view, limit, cursor)
+
+@app.get(
+    "/jobs/{run_id}/{job_id}",
+    operation_id="get_stored_job",
+    summary="Full details of one job from a finished /get_jobs run"
+)
+async def get_job(run_id: str, job_id: str):
+    found = find_job(await stored_jobs(run_id), job_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return FastJSONResponse(found)
+
+async def research_once(github: str, resume: str):
+    # Only one worker runs the crew for a given request; the others wait
+    # for its result in the shared state store. Results are stored under a
+    # random run id, so a rerun after RUN_RESULT_TTL gets a new id and the
+    # id cannot be derived from the inputs.
+    state = get_state()
+    run_key = hashlib.sha256(f"{github}\0{resume}".encode()).hexdigest()
+    while True:
+        run = await state.get("runs", run_key)
+        if run and run["status"] == "done":
+            result = await state.get("results", run["run_id"])
+            if result is not None:
+                return run["run_id"], result
+            # The result expired before its run entry; run again
+            await state.delete("runs", run_key)
+            continue
+        if await state.claim("runs", run_key, {"status": "running"}, ttl=RUN_TIMEOUT):
+            break
+        # Tell the claiming worker that someone still wants this run
+        await state.set("waiting", run_key, True, ttl=WAITER_TTL)
+        await asyncio.sleep(RUN_POLL_INTERVAL)
+
+    # The run has its own deadline and is not tied to this request: if this
+    # client disconnects while others wait for the same run, it keeps going.
+    task = asyncio.ensure_future(shared_run(state, run_key, github, resume))
+    # The event loop only keeps weak references to tasks
+    _shared_runs.add(task)
+    task.add_done_callback(_shared_runs.discard)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        if await state.get("waiting", run_key) is None:
+            task.cancel()
+        raise
+
+async def shared_run(state, run_key: str, github: str, resume: str):
+    with request_scope(JOB_DEADLINE):
+        try:
+            result = jsonable_encoder(await run_job_research_workflow(github, resume))
+        except BaseException:
+            await state.delete("runs", run_key)
+            raise
+        if isinstance(result, dict) and result.get("status") in ("error", "timeout"):
+            await state.delete("runs", run_key)
+            return None, result
+        run_id = uuid.uuid4().hex
+        await state.set("results", run_id, result, ttl=RUN_RESULT_TTL)
+        await state.set(
+            "runs", run_key,
+            {"status": "done", "run_id": run_id},
+            ttl=RUN_RESULT_TTL,
+        )
+        return run_id, result
 @app.post(
         "/fetch",
         operation_id="fetch github repositories"
@@ -74,7 +257,8 @@ async def fetch(github):
     summary="Apply for jobs autonomously (beta)"
 )
 async def apply(
-    request: ApplyRequest  # Accept the link in the request body
+    request: ApplyRequest,  # Accept the link in the request body
+    http_request: Request
 ):
     """
     Initiates the auto-application process for a given link.
@@ -82,7 +266,7 @@ async def apply(
     Args:
       request: Contains the link to apply for
     """
-    return await auto(request.link)
+    return await run_until_disconnect(http_request, auto(request.link, request.resume_id), APPLY_DEADLINE)
 
 # Add an OPTIONS method handler for /get_jobs to help with CORS preflight requests
 @app.options("/get_jobs")
@@ -94,19 +278,25 @@ async def options_get_jobs():
 async def options_apply():
     return {}
 
+# The consolidated MCP server shares this process and its lifespan; its
+# routes must come before the static mount, which matches every path.
+# SSE sessions live in one worker's memory, so a client's messages can land
+# on a worker that does not know its session. With several workers the MCP
+# server runs as its own single process instead (python -m backend.final.server).
+if int(os.environ.get("WEB_CONCURRENCY", 1)) == 1:
+    app.router.routes.extend(mcp_server.sse_app().routes)
+else:
+    logging.getLogger(__name__).warning(
+        "WEB_CONCURRENCY > 1: /mcp/sse is not served by the web workers; "
+        "run python -m backend.final.server with MCP_TRANSPORT=sse"
+    )
+
 app.mount(
     "/", 
     StaticFiles(directory="frontend", html=True), 
     name="Job_UI_STATIC"
 )
 
-mcp = FastApiMCP(
-    app,
-    name="Job match",
-    description="Simple API exposing adding operation",
-)
-
-mcp.mount()
 import os
 import uvicorn
 